@@ -1,10 +1,16 @@
 import streamlit as st
 import openai
-import json
-import pandas as pd
+import finnhub
+import httpx
+import orjson
 import requests
-from datetime import datetime, timedelta
+import threading
+import websocket
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone
 import plotly.graph_objects as go
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel, ValidationError, field_validator
 
 # --- 1. API Key and Client Configuration ---
 try:
@@ -18,29 +24,121 @@ except KeyError as e:
     st.stop()
 
 # Initialize clients and base URLs
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
-import finnhub
-finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
+# Clients live in st.cache_resource so Streamlit reruns reuse them, and their warm connection pools, instead of rebuilding them
 POLYGON_BASE_URL = 'https://api.polygon.io'
 TD_BASE_URL = 'https://api.twelvedata.com'
+HTTP_TIMEOUT = (2, 8) # (connect, read) seconds, so a stalled provider can't hang the Streamlit worker
+
+def make_session():
+    """Creates a requests.Session with a keep-alive pool so repeat calls skip the TCP/TLS handshake."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+@st.cache_resource
+def get_openai(api_key: str):
+    # Pooled HTTP/2 transport so both OpenAI round trips of a turn reuse the same TLS connection
+    return openai.OpenAI(
+        api_key=api_key,
+        http_client=openai.DefaultHttpxClient(http2=True, limits=httpx.Limits(max_keepalive_connections=20)),
+    )
+
+@st.cache_resource
+def get_finnhub(api_key: str):
+    return finnhub.Client(api_key=api_key)
+
+@st.cache_resource
+def get_polygon_session():
+    return make_session()
+
+@st.cache_resource
+def get_td_session():
+    return make_session()
+
+client = get_openai(OPENAI_API_KEY)
+finnhub_client = get_finnhub(FINNHUB_API_KEY)
+POLYGON_SESSION = get_polygon_session()
+TD_SESSION = get_td_session()
+
+def _warm(session, url):
+    try:
+        session.head(url, timeout=2)
+    except requests.RequestException:
+        pass # Best effort; the real request will simply pay the handshake itself
+
+@st.cache_resource
+def prewarm_connections():
+    """Opens one pooled connection per provider in the background so the first prompt skips DNS + TCP + TLS setup.
+    Runs once per Streamlit process, on the same cached sessions the tools use."""
+    targets = [(POLYGON_SESSION, POLYGON_BASE_URL), (TD_SESSION, TD_BASE_URL)]
+    # finnhub.Client keeps its requests.Session private; warm it only if it is exposed as expected
+    if (finnhub_session := getattr(finnhub_client, "_session", None)) is not None:
+        targets.append((finnhub_session, "https://finnhub.io"))
+    for session, url in targets:
+        threading.Thread(target=_warm, args=(session, url), daemon=True).start()
+
+prewarm_connections()
+
+# Tickers streamed live from Finnhub's trade WebSocket instead of being polled
+LIVE_TICKERS = ("AAPL",)
+FINNHUB_WS_URL = "wss://ws.finnhub.io"
+LIVE_TRADE_MAX_AGE = timedelta(minutes=5)
+
+@st.cache_resource
+def start_trade_stream(api_key: str, symbols: tuple):
+    """Subscribes once per Streamlit process to Finnhub trades for the given symbols on a background thread.
+    Returns a dict holding only the latest trade per symbol, so memory stays bounded however long the feed runs."""
+    latest = {}
+
+    def on_message(ws, message):
+        payload = orjson.loads(message)
+        if payload.get("type") == "trade":
+            for trade in payload["data"]:
+                latest[trade["s"]] = trade
+
+    def on_open(ws):
+        for symbol in symbols:
+            ws.send(orjson.dumps({"type": "subscribe", "symbol": symbol}).decode())
+
+    ws = websocket.WebSocketApp(f"{FINNHUB_WS_URL}?token={api_key}", on_open=on_open, on_message=on_message)
+    threading.Thread(target=ws.run_forever, kwargs={"reconnect": 5}, daemon=True).start()
+    return latest
+
+live_trades = start_trade_stream(FINNHUB_API_KEY, LIVE_TICKERS)
 
 # --- 2. Tool Functions with Optimized API Strategy ---
 
+# Cache lifetimes (seconds), aligned with how often each provider's data actually changes.
+# Cached fetchers return data or raise, since st.cache_data never stores a call that raised; the uncached
+# tool wrappers turn those exceptions into error JSON, so a transient failure is not replayed for the whole TTL.
+CACHE_TTL = {
+    "get_stock_price_and_vwap": 60,
+    "get_company_news": 900,
+    "get_candlestick_chart": 3600,
+    "get_technical_analysis": 900,
+}
+
+@st.cache_data(ttl=CACHE_TTL["get_stock_price_and_vwap"], show_spinner=False)
+def fetch_prev_day_aggregates(ticker_symbol: str):
+    """Gets the previous day's aggregates bar from Polygon.io."""
+    url = f"{POLYGON_BASE_URL}/v2/aggs/ticker/{ticker_symbol}/prev"
+    params = {'apiKey': POLYGON_API_KEY}
+    response = POLYGON_SESSION.get(url, params=params, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    if data.get("resultsCount", 0) == 0:
+        raise ValueError(f"No previous day data found for {ticker_symbol} on Polygon.io.")
+    return data['ticker'], data['results'][0]
+
 def get_stock_price_and_vwap(ticker_symbol: str):
-    """Gets the previous day's closing price, change, and Volume Weighted Average Price (VWAP) from Polygon.io."""
+    """Gets the previous day's closing price, change, and Volume Weighted Average Price (VWAP) from Polygon.io,
+    plus the last streamed trade for live tickers."""
     try:
-        ticker_symbol = ticker_symbol.upper()
-        url = f"{POLYGON_BASE_URL}/v2/aggs/ticker/{ticker_symbol}/prev"
-        params = {'apiKey': POLYGON_API_KEY}
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("resultsCount", 0) == 0:
-            return json.dumps({"error": f"No previous day data found for {ticker_symbol} on Polygon.io."})
-        
-        result = data['results'][0]
-        return json.dumps({
-            "ticker": data['ticker'],
+        ticker, result = fetch_prev_day_aggregates(ticker_symbol)
+        data = {
+            "ticker": ticker,
             "close": result['c'],
             "high": result['h'],
             "low": result['l'],
@@ -49,88 +147,158 @@ def get_stock_price_and_vwap(ticker_symbol: str):
             "vwap": result.get('vw'), # VWAP is included in this endpoint
             "change": result['c'] - result['o'], # Calculate change
             "percent_change": ((result['c'] - result['o']) / result['o']) * 100
-        })
+        }
+        # The live price comes from the background WebSocket, so it is never stuck behind the 60s cache
+        # Trades older than LIVE_TRADE_MAX_AGE (e.g. last session's close) are not reported as live
+        trade = live_trades.get(ticker_symbol)
+        if trade is not None and (trade_time := datetime.fromtimestamp(trade["t"] / 1000, tz=timezone.utc)) >= datetime.now(timezone.utc) - LIVE_TRADE_MAX_AGE:
+            data["live_price"] = trade["p"]
+            data["live_trade_time"] = trade_time.isoformat(timespec="seconds")
+        return orjson.dumps(data).decode()
     except Exception as e:
-        return json.dumps({"error": f"An error occurred with Polygon.io price check: {str(e)}"})
+        return orjson.dumps({"error": f"An error occurred with Polygon.io price check: {str(e)}"}).decode()
+
+@st.cache_data(ttl=CACHE_TTL["get_company_news"], show_spinner=False)
+def fetch_company_news(ticker_symbol: str):
+    """Gets the five latest headlines from the past week of Finnhub news."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    one_week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+    news = finnhub_client.company_news(ticker_symbol, _from=one_week_ago, to=today)
+    return [{'headline': article['headline'], 'summary': article['summary']} for article in news[:5]]
 
 def get_company_news(ticker_symbol: str):
     """Gets the latest news with sentiment analysis from Finnhub."""
     try:
-        ticker_symbol = ticker_symbol.upper()
-        today = datetime.now().strftime('%Y-%m-%d')
-        one_week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-        news = finnhub_client.company_news(ticker_symbol, _from=one_week_ago, to=today)
+        news = fetch_company_news(ticker_symbol)
         if not news:
-            return json.dumps({"message": "No recent news found from Finnhub."})
-        return json.dumps([{'headline': article['headline'], 'summary': article['summary']} for article in news[:5]])
+            return orjson.dumps({"message": "No recent news found from Finnhub."}).decode()
+        return orjson.dumps(news).decode()
     except Exception as e:
-        return json.dumps({"error": f"An unexpected error occurred while fetching news from Finnhub: {str(e)}"})
+        return orjson.dumps({"error": f"An unexpected error occurred while fetching news from Finnhub: {str(e)}"}).decode()
+
+@st.cache_data(ttl=CACHE_TTL["get_candlestick_chart"], show_spinner=False)
+def fetch_daily_bars(ticker_symbol: str):
+    """Gets one year of daily OHLCV bars from Polygon.io."""
+    today = datetime.now()
+    one_year_ago = today - timedelta(days=365)
+    url = f"{POLYGON_BASE_URL}/v2/aggs/ticker/{ticker_symbol}/range/1/day/{one_year_ago.strftime('%Y-%m-%d')}/{today.strftime('%Y-%m-%d')}"
+    params = {'apiKey': POLYGON_API_KEY}
+    response = POLYGON_SESSION.get(url, params=params, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    if data.get("status") != "OK" or data.get("resultsCount", 0) == 0:
+        raise ValueError("No historical data found on Polygon.io for this ticker.")
+    return data['results']
+
+# Figures built by get_candlestick_chart during this run, keyed by ticker, for the UI to render on the main thread
+pending_charts = {}
+
+def build_candlestick_figure(ticker_symbol: str, bars):
+    """Builds the Plotly candlestick figure from already fetched daily bars."""
+    # go.Candlestick takes plain lists, so no DataFrame is needed
+    times = [datetime.fromtimestamp(bar['t'] / 1000, tz=timezone.utc) for bar in bars]
+    opens = [bar['o'] for bar in bars]
+    highs = [bar['h'] for bar in bars]
+    lows = [bar['l'] for bar in bars]
+    closes = [bar['c'] for bar in bars]
+
+    fig = go.Figure(data=[go.Candlestick(x=times, open=opens, high=highs, low=lows, close=closes)])
+    fig.update_layout(title=f'{ticker_symbol} Candlestick Chart (Data from Polygon.io)', xaxis_title='Date', yaxis_title='Price (USD)', xaxis_rangeslider_visible=False, template='plotly_dark')
+    return fig
 
 def get_candlestick_chart(ticker_symbol: str):
-    """Gets historical data from Polygon.io to display as a chart."""
+    """Gets historical data from Polygon.io to display as a chart.
+    Only a compact summary goes back to the model; the figure is built from the same bars and left in pending_charts for the UI."""
     try:
-        ticker_symbol = ticker_symbol.upper()
-        today = datetime.now()
-        one_year_ago = today - timedelta(days=365)
-        url = f"{POLYGON_BASE_URL}/v2/aggs/ticker/{ticker_symbol}/range/1/day/{one_year_ago.strftime('%Y-%m-%d')}/{today.strftime('%Y-%m-%d')}"
-        params = {'apiKey': POLYGON_API_KEY}
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("status") != "OK" or data.get("resultsCount", 0) == 0:
-            return json.dumps({"error": "No historical data found on Polygon.io for this ticker."})
-        
-        df = pd.DataFrame(data['results'])
-        df['time'] = pd.to_datetime(df['t'], unit='ms')
-        df = df.rename(columns={'o': 'Open', 'h': 'High', 'l': 'Low', 'c': 'Close', 'v': 'Volume'})
-        df = df.sort_index()
-
-        fig = go.Figure(data=[go.Candlestick(x=df['time'], open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'])])
-        fig.update_layout(title=f'{ticker_symbol} Candlestick Chart (Data from Polygon.io)', xaxis_title='Date', yaxis_title='Price (USD)', xaxis_rangeslider_visible=False, template='plotly_dark')
-        
-        return json.dumps({"display_plotly_chart": True, "chart_json": fig.to_json()})
+        bars = fetch_daily_bars(ticker_symbol)
+        pending_charts[ticker_symbol] = build_candlestick_figure(ticker_symbol, bars)
+        first_close, last_close = bars[0]['c'], bars[-1]['c']
+        period_change = ((last_close - first_close) / first_close) * 100
+        return orjson.dumps({
+            "display_plotly_chart": True,
+            "ticker": ticker_symbol,
+            "bars": len(bars),
+            "last_close": last_close,
+            "period_high": max(bar['h'] for bar in bars),
+            "period_low": min(bar['l'] for bar in bars),
+            "period_percent_change": round(period_change, 2),
+            "trend": "up" if period_change > 0 else "down" if period_change < 0 else "flat",
+        }).decode()
     except Exception as e:
-        return json.dumps({"error": f"An error occurred with Polygon.io charting: {str(e)}"})
+        return orjson.dumps({"error": f"An error occurred with Polygon.io charting: {str(e)}"}).decode()
+
+def _fetch_indicator(ticker_symbol: str, indicator: str):
+    """Fetches the latest value of a single Twelve Data indicator, or None if none is available."""
+    params = {
+        'symbol': ticker_symbol, 'interval': '1day', 'apikey': TWELVE_DATA_API_KEY,
+        'outputsize': 1 # We only need the latest value
+    }
+    # Add specific parameters for each indicator
+    if indicator == 'MACD':
+        params['fast_period'] = 12
+        params['slow_period'] = 26
+        params['signal_period'] = 9
+
+    response = TD_SESSION.get(f"{TD_BASE_URL}/{indicator.lower()}", params=params, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    if data.get("status") == "ok" and data.get("values"):
+        latest_point = data['values'][0]
+        return {k: round(float(v), 2) for k, v in latest_point.items() if k != 'datetime'}
+    return None
+
+@st.cache_data(ttl=CACHE_TTL["get_technical_analysis"], show_spinner=False)
+def fetch_technical_indicators(ticker_symbol: str):
+    """Gets the latest RSI, MACD, EMA and ADX values from Twelve Data."""
+    indicators = ['RSI', 'MACD', 'EMA', 'ADX']
+    # One request per indicator, fanned out so the tool costs ~1 round trip instead of 4
+    with ThreadPoolExecutor(max_workers=len(indicators)) as executor:
+        futures = {indicator: executor.submit(_fetch_indicator, ticker_symbol, indicator) for indicator in indicators}
+        results = {indicator: future.result() for indicator, future in futures.items()}
+    results = {indicator: values for indicator, values in results.items() if values is not None}
+    if not results:
+        raise ValueError("Could not retrieve any technical indicators from Twelve Data.")
+    return results
 
 def get_technical_analysis(ticker_symbol: str):
     """Gets a summary of key technical indicators (RSI, MACD, EMA, ADX) from Twelve Data."""
     try:
-        ticker_symbol = ticker_symbol.upper()
-        indicators = ['RSI', 'MACD', 'EMA', 'ADX']
-        results = {}
-        for indicator in indicators:
-            params = {
-                'symbol': ticker_symbol, 'interval': '1day', 'apikey': TWELVE_DATA_API_KEY,
-                'outputsize': 1 # We only need the latest value
-            }
-            # Add specific parameters for each indicator
-            if indicator == 'MACD':
-                params['fast_period'] = 12
-                params['slow_period'] = 26
-                params['signal_period'] = 9
-
-            response = requests.get(f"{TD_BASE_URL}/{indicator.lower()}", params=params)
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "ok" and data.get("values"):
-                latest_point = data['values'][0]
-                results[indicator] = {k: round(float(v), 2) for k, v in latest_point.items() if k != 'datetime'}
-        
-        if not results:
-            return json.dumps({"error": "Could not retrieve any technical indicators from Twelve Data."})
-            
-        return json.dumps(results)
+        return orjson.dumps(fetch_technical_indicators(ticker_symbol)).decode()
     except Exception as e:
-        return json.dumps({"error": f"An error occurred during technical analysis with Twelve Data: {str(e)}"})
+        return orjson.dumps({"error": f"An error occurred during technical analysis with Twelve Data: {str(e)}"}).decode()
 
 # --- 3. OpenAI Tool and Model Configuration (Optimized) ---
-tools = [
-    {"type": "function", "function": {"name": "get_stock_price_and_vwap", "description": "Get the latest stock price and VWAP from Polygon.io.", "parameters": {"type": "object", "properties": {"ticker_symbol": {"type": "string"}}, "required": ["ticker_symbol"]}}},
-    {"type": "function", "function": {"name": "get_company_news", "description": "Get the latest news for a company from Finnhub.", "parameters": {"type": "object", "properties": {"ticker_symbol": {"type": "string"}}, "required": ["ticker_symbol"]}}},
-    {"type": "function", "function": {"name": "get_candlestick_chart", "description": "Display an interactive candlestick chart from Polygon.io.", "parameters": {"type": "object", "properties": {"ticker_symbol": {"type": "string"}}, "required": ["ticker_symbol"]}}},
-    {"type": "function", "function": {"name": "get_technical_analysis", "description": "Get key technical indicators (RSI, MACD, EMA, ADX) for a stock from Twelve Data.", "parameters": {"type": "object", "properties": {"ticker_symbol": {"type": "string"}}, "required": ["ticker_symbol"]}}},
-]
-MODEL = "gpt-4o"
+class TickerArgs(BaseModel):
+    """Arguments shared by every tool: a single ticker symbol, normalized to its canonical uppercase form.
+    Tools receive the validated value, so "aapl" and "AAPL" share the same cache entries and dedupe key."""
+    ticker_symbol: str
+
+    @field_validator("ticker_symbol")
+    @classmethod
+    def _normalize(cls, v: str) -> str:
+        v = v.strip().upper()
+        if not v:
+            raise ValueError("ticker_symbol must not be empty")
+        return v
+
+@st.cache_resource
+def get_tools():
+    """Builds the OpenAI tool schema once per process; it never changes, so reruns reuse the same object."""
+    ticker_parameters = {"type": "object", "properties": {"ticker_symbol": {"type": "string"}}, "required": ["ticker_symbol"]}
+    descriptions = {
+        "get_stock_price_and_vwap": "Get the latest stock price and VWAP from Polygon.io.",
+        "get_company_news": "Get the latest news for a company from Finnhub.",
+        "get_candlestick_chart": "Display an interactive candlestick chart from Polygon.io.",
+        "get_technical_analysis": "Get key technical indicators (RSI, MACD, EMA, ADX) for a stock from Twelve Data.",
+    }
+    return [
+        {"type": "function", "function": {"name": name, "description": description, "parameters": ticker_parameters}}
+        for name, description in descriptions.items()
+    ]
+
+tools = get_tools()
+ROUTER_MODEL = "gpt-4o-mini" # Picks tools and extracts tickers; cheap and fast is enough here
+ANSWER_MODEL = "gpt-4o" # Writes the final answer from the tool results
 available_functions = {
     "get_stock_price_and_vwap": get_stock_price_and_vwap,
     "get_company_news": get_company_news,
@@ -138,54 +306,134 @@ available_functions = {
     "get_technical_analysis": get_technical_analysis,
 }
 
+# Bounds on the history sent to OpenAI, so per-turn cost and latency stay flat as the chat grows
+MAX_MESSAGES = 40
+MAX_CHARS = 16000
+
+def trim_history(messages, max_messages=MAX_MESSAGES, max_chars=MAX_CHARS):
+    """Keeps the system prompt plus the most recent turns that fit within the message and character budgets.
+    A turn (a user message and everything up to the next one) is kept or dropped whole, so tool_call_ids stay paired
+    and the latest turn, including the question being answered, is always kept even when it alone is over budget."""
+    system_messages = [msg for msg in messages if msg.get("role") == "system"]
+    turns = []
+    for msg in messages:
+        if msg.get("role") == "system":
+            continue
+        if msg.get("role") == "user" or not turns:
+            turns.append([msg])
+        else:
+            turns[-1].append(msg)
+
+    budget_messages = max_messages - len(system_messages)
+    budget_chars = max_chars - sum(len(str(msg.get("content") or "")) for msg in system_messages)
+    kept = []
+    for turn in reversed(turns):
+        turn_chars = sum(len(str(msg.get("content") or "")) for msg in turn)
+        if kept and (len(turn) > budget_messages or turn_chars > budget_chars):
+            break
+        kept.append(turn)
+        budget_messages -= len(turn)
+        budget_chars -= turn_chars
+
+    # A tool response left without its assistant tool-call message would be rejected by the API
+    recent = [msg for turn in reversed(kept) if turn[0].get("role") != "tool" for msg in turn]
+    return system_messages + recent
+
+# Only these fields matter to the Chat Completions API; the rest of a model_dump() (refusal, audio, legacy function_call...) is dead weight
+API_MESSAGE_KEYS = {"role", "content", "tool_calls", "tool_call_id", "name"}
+
+def slim_message(msg):
+    """Strips a stored message down to the fields the API reads, dropping unset (None) values."""
+    return {k: v for k, v in msg.items() if k in API_MESSAGE_KEYS and v is not None}
+
 # --- 4 & 5. Streamlit UI and Chat Logic ---
 st.set_page_config(page_title="AI Financial Co-pilot", page_icon="📈", layout="wide")
 st.title("📈 AI Financial Co-pilot")
 st.caption("Optimized with Polygon.io, Twelve Data, and Finnhub. How can I help?")
 
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# messages_full is the transcript for display; messages_api is the already filtered, slimmed and
+# windowed history sent to OpenAI, so no turn has to re-scan the whole conversation.
+if "messages_full" not in st.session_state:
+    st.session_state.messages_full = []
+    st.session_state.messages_api = []
 
-for message in st.session_state.messages:
+def append_message(msg):
+    """Records a message for display and, if the API can use it, in the bounded API history."""
+    st.session_state.messages_full.append(msg)
+    if msg.get("content") is not None or msg.get("tool_calls"):
+        st.session_state.messages_api.append(slim_message(msg))
+        st.session_state.messages_api = trim_history(st.session_state.messages_api)
+
+for message in st.session_state.messages_full:
     if message["role"] != "tool" and message.get("content"):
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
 if prompt := st.chat_input("Ask about a stock..."):
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    append_message({"role": "user", "content": prompt})
     with st.chat_message("user"):
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
         with st.spinner("Analyzing..."):
-            api_messages = [msg for msg in st.session_state.messages if msg.get("content") is not None or msg.get("tool_calls")]
             response = client.chat.completions.create(
-                model=MODEL, messages=api_messages, tools=tools, tool_choice="auto",
+                model=ROUTER_MODEL, messages=st.session_state.messages_api, tools=tools, tool_choice="auto",
             )
             response_message = response.choices[0].message
-            st.session_state.messages.append(response_message.model_dump(exclude_unset=True))
+            append_message(response_message.model_dump(exclude_unset=True))
 
             if response_message.tool_calls:
+                # Identical calls (same function and ticker) are executed once and their
+                # result fanned out to every matching tool_call_id.
+                call_keys, unique_calls, results = {}, {}, {}
+                for tool_call in response_message.tool_calls:
+                    try:
+                        if tool_call.function.name not in available_functions:
+                            raise KeyError(tool_call.function.name)
+                        # Arguments are parsed and validated exactly once, here at the dispatch site
+                        args = TickerArgs.model_validate_json(tool_call.function.arguments)
+                    except (KeyError, ValidationError) as e:
+                        # Answered with an error result so every tool_call_id still gets its tool reply
+                        reason = f"unknown function `{tool_call.function.name}`" if isinstance(e, KeyError) else e.errors()[0]['msg']
+                        key = (tool_call.function.name, tool_call.function.arguments)
+                        results[key] = orjson.dumps({"error": f"Invalid arguments from the model: {reason}"}).decode()
+                    else:
+                        key = (tool_call.function.name, args.ticker_symbol)
+                        if key not in unique_calls:
+                            unique_calls[key] = args
+                            st.write(f"🤖 Calling `{tool_call.function.name}`...")
+                    call_keys[tool_call.id] = key
+
+                # Tool calls are independent network round-trips, so run them concurrently
+                # and keep all Streamlit rendering on the main thread afterwards.
+                if unique_calls:
+                    with ThreadPoolExecutor(max_workers=len(unique_calls)) as executor:
+                        futures = {
+                            key: executor.submit(available_functions[key[0]], args.ticker_symbol)
+                            for key, args in unique_calls.items()
+                        }
+                        results.update({key: future.result() for key, future in futures.items()})
+
                 tool_outputs = []
+                rendered = set()
                 for tool_call in response_message.tool_calls:
                     function_name = tool_call.function.name
-                    function_to_call = available_functions[function_name]
-                    function_args = json.loads(tool_call.function.arguments)
-                    st.write(f"🤖 Calling `{function_name}`...")
-                    function_response_str = function_to_call(**function_args)
+                    key = call_keys[tool_call.id]
+                    function_response_str = results[key]
                     
                     try:
-                        response_data = json.loads(function_response_str)
-                        if isinstance(response_data, dict):
+                        response_data = orjson.loads(function_response_str)
+                        if isinstance(response_data, dict) and key not in rendered:
+                            rendered.add(key)
                             if error_message := response_data.get("error"):
                                 st.error(f"API Error for `{function_name}`: {error_message}")
                             
                             elif response_data.get("display_plotly_chart"):
-                                fig_json = response_data["chart_json"]
-                                fig = go.Figure(json.loads(fig_json))
-                                st.plotly_chart(fig, use_container_width=True)
+                                # No second fetch here: the figure was built from the bars the tool already had
+                                if (fig := pending_charts.pop(response_data["ticker"], None)) is not None:
+                                    st.plotly_chart(fig, use_container_width=True)
 
-                    except (json.JSONDecodeError, TypeError):
+                    except (orjson.JSONDecodeError, TypeError):
                         pass
 
                     tool_outputs.append({
@@ -193,11 +441,13 @@ if prompt := st.chat_input("Ask about a stock..."):
                         "name": function_name, "content": function_response_str,
                     })
                 
-                st.session_state.messages.extend(tool_outputs)
-                second_response = client.chat.completions.create(model=MODEL, messages=st.session_state.messages)
-                final_response_message = second_response.choices[0].message
-                st.markdown(final_response_message.content)
-                st.session_state.messages.append(final_response_message.model_dump(exclude_unset=True))
+                for tool_output in tool_outputs:
+                    append_message(tool_output)
+                # Stream the final answer so the first tokens render while the rest is generated
+                stream = client.chat.completions.create(model=ANSWER_MODEL, messages=st.session_state.messages_api, stream=True)
+                final_content = st.write_stream(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+                append_message({"role": "assistant", "content": final_content})
             else:
+                # No tools needed: the router's reply is the answer, so the turn costs a single gpt-4o-mini call
                 st.markdown(response_message.content)
 